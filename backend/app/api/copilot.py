@@ -1,19 +1,38 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
+import asyncio
 import boto3
 import json
 import logging
 import re
 from typing import List, Dict, Optional, Any
 from datetime import datetime
+from app.services import prefetch_service
+from app.services.session_service import (
+    apply_form_data_diff,
+    create_session,
+    get_session,
+    save_session,
+)
 
 router = APIRouter(prefix="/copilot")
 
 class CopilotRequest(BaseModel):
-    messages: List[Dict[str, Any]]
-    context: List[str]
-    formData: Dict[str, Any]
+    # Full payload: sent on the first turn (or by clients that don't use sessions)
+    messages: List[Dict[str, Any]] = []
+    context: List[str] = []
+    formData: Optional[Dict[str, Any]] = None
+    step: int
+    # Session payload: later turns send only the new message and the changed form fields
+    sessionId: Optional[str] = None
+    message: Optional[str] = None
+    formDataDiff: Dict[str, Any] = {}
+
+class CopilotPrefetchRequest(BaseModel):
+    # The step to prepare guidance for (usually the one after the step just completed)
     step: int
+    formData: Dict[str, Any] = {}
 
 # Configure logging
 logging.basicConfig(
@@ -23,136 +42,199 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def render_form_data(form_data: Dict[str, Any]) -> str:
+    """Render form data as the prompt text block; empty string if there is nothing to send."""
+    form_data_lines = []
+    for key, value in form_data.items():
+        if value is None:
+            continue
+        if isinstance(value, (list, dict)):
+            # Convert lists and dicts to JSON strings
+            form_data_lines.append(f"{key}: {json.dumps(value)}")
+        else:
+            # Handle primitive types (str, bool, int, float)
+            form_data_lines.append(f"{key}: {str(value)}")
+    return "Form Data:\n" + "\n".join(form_data_lines) if form_data_lines else ""
+
+def load_session_state(request: CopilotRequest) -> Dict[str, Any]:
+    """Build this turn's session state from the stored session or, on the first turn, from the full payload."""
+    if request.sessionId:
+        session = get_session(request.sessionId)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Copilot session not found or expired")
+        form_data = session["formData"]
+        form_data_text = session["formDataText"]
+        if request.formData is not None:
+            form_data = request.formData
+        if request.formDataDiff:
+            form_data = apply_form_data_diff(form_data, request.formDataDiff)
+        if form_data is not session["formData"]:
+            form_data_text = render_form_data(form_data)
+        history = list(session["messages"])
+        context = session["context"]
+    else:
+        form_data = request.formData or {}
+        form_data_text = render_form_data(form_data)
+        history = [
+            {"role": msg.get('role'), "content": str(msg.get('content'))}
+            for msg in request.messages
+        ]
+        context = request.context
+
+    if request.message is not None:
+        history.append({"role": "user", "content": request.message})
+
+    return {
+        "step": request.step,
+        "messages": history,
+        "context": context,
+        "formData": form_data,
+        "formDataText": form_data_text,
+    }
+
+# Define step-specific instructions to make the Copilot smarter
+STEP_INSTRUCTIONS = {
+    1: "You are assisting with defining a challenge. Focus on creating clear, specific, and measurable goals, and ensure the challenge is well-scoped. Use the form data to tailor your suggestions.",
+    2: "You are helping define the target audience for a challenge. Suggest strategies to reach the right participants, considering diversity, skills, and geographic factors.",
+    3: "You are assisting with setting submission requirements. Provide clear and practical suggestions for formats, documentation, and instructions to ensure participants can submit effectively.",
+    4: "You are helping design prizes and incentives. Suggest a balanced prize structure, considering budget, non-monetary rewards, and sponsorship opportunities.",
+    5: "You are assisting with setting a timeline and milestones. Suggest a realistic schedule with clear deadlines and buffers to ensure the challenge runs smoothly.",
+    6: "You are helping define evaluation criteria. Suggest fair and transparent criteria, judging processes, and methods to handle ties.",
+    7: "You are assisting with success metrics and challenge management. Suggest key metrics, notification strategies, and dispute resolution methods to ensure the challenge is successful."
+}
+
 # Initialize Bedrock client
 bedrock = boto3.client(
     service_name="bedrock-runtime",
     region_name="us-east-1"
 )
 
-@router.post("", response_model=Dict)
-async def copilot_chat(request: CopilotRequest):
-    try:
-        # Define step-specific instructions to make the Copilot smarter
-        step_instructions = {
-            1: "You are assisting with defining a challenge. Focus on creating clear, specific, and measurable goals, and ensure the challenge is well-scoped. Use the form data to tailor your suggestions.",
-            2: "You are helping define the target audience for a challenge. Suggest strategies to reach the right participants, considering diversity, skills, and geographic factors.",
-            3: "You are assisting with setting submission requirements. Provide clear and practical suggestions for formats, documentation, and instructions to ensure participants can submit effectively.",
-            4: "You are helping design prizes and incentives. Suggest a balanced prize structure, considering budget, non-monetary rewards, and sponsorship opportunities.",
-            5: "You are assisting with setting a timeline and milestones. Suggest a realistic schedule with clear deadlines and buffers to ensure the challenge runs smoothly.",
-            6: "You are helping define evaluation criteria. Suggest fair and transparent criteria, judging processes, and methods to handle ties.",
-            7: "You are assisting with success metrics and challenge management. Suggest key metrics, notification strategies, and dispute resolution methods to ensure the challenge is successful."
-        }
+def generate_reply(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Call Bedrock for the given session state and return the reply text, suggestions and token usage."""
+    # Prepare system prompt (cacheable)
+    system_prompt_parts = []
 
-        # Prepare system prompt (cacheable)
-        system_prompt_parts = []
+    # Add step-specific instruction
+    instruction = STEP_INSTRUCTIONS.get(state["step"], "You are assisting with a challenge creation process.")
+    system_prompt_parts.append({
+        "type": "text",
+        "text": instruction,
+        "cache_control": {"type": "ephemeral"}
+    })
 
-        # Add step-specific instruction
-        instruction = step_instructions.get(request.step, "You are assisting with a challenge creation process.")
-        system_prompt_parts.append({
-            "type": "text",
-            "text": instruction,
-            "cache_control": {"type": "ephemeral"}
+    # Prepare messages list
+    messages = []
+
+    # Add formData as cacheable content if available (rendered once per change, kept in the session)
+    if state["formDataText"]:
+        messages.append({
+            "role": "user",
+            "content": [
+                {"type": "text", "text": state["formDataText"], "cache_control": {"type": "ephemeral"}}
+            ]
         })
 
-        # Prepare messages list
-        messages = []
-
-        # Add formData as cacheable content if available
-        if request.formData:
-            # formData is already a dictionary, so iterate directly
-            form_data_lines = []
-            for key, value in request.formData.items():
-                if value is None:
-                    continue
-                if isinstance(value, (list, dict)):
-                    # Convert lists and dicts to JSON strings
-                    form_data_lines.append(f"{key}: {json.dumps(value)}")
-                else:
-                    # Handle primitive types (str, bool, int, float)
-                    form_data_lines.append(f"{key}: {str(value)}")
-            if form_data_lines:
-                messages.append({
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": "Form Data:\n" + "\n".join(form_data_lines), "cache_control": {"type": "ephemeral"}}
-                    ]
-                })
-
-        # Add context as cacheable content
-        if request.context:
-            messages.append({
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": "Context: " + " ".join(request.context), "cache_control": {"type": "ephemeral"}}
-                ]
-            })
-
-        # Add messages (non-cacheable, dynamic part)
-        for msg in request.messages:
-            messages.append({
-                "role": msg.get('role'),
-                "content": [{"type": "text", "text": str(msg.get('content'))}]
-            })
-
-        # Request for dynamic suggestions (non-cacheable), with length constraint
+    # Add context as cacheable content
+    if state["context"]:
         messages.append({
             "role": "user",
-            "content": [{"type": "text", "text": "Based on the above context and conversation, please provide 5 tailored suggestion tips as a JSON array of strings under the key 'suggestions' at the end of your response, e.g., {\"suggestions\": [\"Tip 1\", \"Tip 2\", \"Tip 3\", \"Tip 4\", \"Tip 5\"]}). Each suggestion must be concise, under 80 characters. Ensure the suggestions are relevant to the current step and conversation."}]
+            "content": [
+                {"type": "text", "text": "Context: " + " ".join(state["context"]), "cache_control": {"type": "ephemeral"}}
+            ]
         })
 
-        # Combine into final request body
-        messages_api_body = {
-            "anthropic_version": "bedrock-2023-05-31",
-            "max_tokens": 600,
-            "system": system_prompt_parts,
-            "messages": messages
-        }
-        
-        logger.debug(f"Sending prompt to Bedrock: {json.dumps(messages_api_body, indent=2)}")
-
-        # Call Bedrock model with Claude 3.7 Sonnet
-        response = bedrock.invoke_model(
-            modelId="us.anthropic.claude-3-7-sonnet-20250219-v1:0",
-            body=json.dumps(messages_api_body),
-            contentType="application/json",
-            accept="application/json"
-        )
-
-        logger.debug(f"Received response from Bedrock: {response}")
-
-        # Parse the response
-        response_body = json.loads(response['body'].read())
-        logger.debug(f"Parsed response body: {response_body}")
-
-        # Extract the generated text
-        if "content" not in response_body or not response_body["content"]:
-            logger.error(f"Unexpected response format from Bedrock: {response_body}")
-            raise HTTPException(status_code=500, detail="Unexpected response format from Bedrock model")
-
-        result = response_body["content"][0]["text"] if isinstance(response_body["content"][0], dict) else response_body["content"][0]
-
-        # Extract suggestions if present
-        suggestions_match = re.search(r'{\s*"suggestions"\s*:\s*\[\s*("[^"]*"(?:\s*,\s*"[^"]*")*\s*)\]\s*}', result, re.DOTALL)
-        suggestions = []
-        if suggestions_match:
-            suggestions_str = suggestions_match.group(1)
-            # Clean up the suggestions string: remove newlines and extra whitespace
-            suggestions_str = suggestions_str.replace('\n', '').replace('\r', '')
-            suggestions_str = re.sub(r'\s+', ' ', suggestions_str.strip())
-            # Ensure proper JSON format by reconstructing the array
-            try:
-                # Parse the cleaned suggestions string as a JSON array
-                suggestions_array = json.loads(f'[{suggestions_str}]')
-                suggestions = suggestions_array
-            except json.JSONDecodeError as e:
-                logger.error(f"Failed to parse suggestions JSON: {str(e)}, raw string: {suggestions_str}")
-                suggestions = []
+    # Add messages (non-cacheable, dynamic part)
+    for msg in state["messages"]:
+        messages.append({
+            "role": msg["role"],
+            "content": [{"type": "text", "text": msg["content"]}]
+        })
+
+    # Request for dynamic suggestions (non-cacheable), with length constraint
+    messages.append({
+        "role": "user",
+        "content": [{"type": "text", "text": "Based on the above context and conversation, please provide 5 tailored suggestion tips as a JSON array of strings under the key 'suggestions' at the end of your response, e.g., {\"suggestions\": [\"Tip 1\", \"Tip 2\", \"Tip 3\", \"Tip 4\", \"Tip 5\"]}). Each suggestion must be concise, under 80 characters. Ensure the suggestions are relevant to the current step and conversation."}]
+    })
+
+    # Combine into final request body
+    messages_api_body = {
+        "anthropic_version": "bedrock-2023-05-31",
+        "max_tokens": 600,
+        "system": system_prompt_parts,
+        "messages": messages
+    }
+    
+    logger.debug(f"Sending prompt to Bedrock: {json.dumps(messages_api_body, indent=2)}")
+
+    # Call Bedrock model with Claude 3.7 Sonnet
+    response = bedrock.invoke_model(
+        modelId="us.anthropic.claude-3-7-sonnet-20250219-v1:0",
+        body=json.dumps(messages_api_body),
+        contentType="application/json",
+        accept="application/json"
+    )
+
+    logger.debug(f"Received response from Bedrock: {response}")
+
+    # Parse the response
+    response_body = json.loads(response['body'].read())
+    logger.debug(f"Parsed response body: {response_body}")
+
+    # Extract the generated text
+    if "content" not in response_body or not response_body["content"]:
+        logger.error(f"Unexpected response format from Bedrock: {response_body}")
+        raise HTTPException(status_code=500, detail="Unexpected response format from Bedrock model")
+
+    result = response_body["content"][0]["text"] if isinstance(response_body["content"][0], dict) else response_body["content"][0]
+
+    # Extract suggestions if present
+    suggestions_match = re.search(r'{\s*"suggestions"\s*:\s*\[\s*("[^"]*"(?:\s*,\s*"[^"]*")*\s*)\]\s*}', result, re.DOTALL)
+    suggestions = []
+    if suggestions_match:
+        suggestions_str = suggestions_match.group(1)
+        # Clean up the suggestions string: remove newlines and extra whitespace
+        suggestions_str = suggestions_str.replace('\n', '').replace('\r', '')
+        suggestions_str = re.sub(r'\s+', ' ', suggestions_str.strip())
+        # Ensure proper JSON format by reconstructing the array
+        try:
+            # Parse the cleaned suggestions string as a JSON array
+            suggestions_array = json.loads(f'[{suggestions_str}]')
+            suggestions = suggestions_array
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to parse suggestions JSON: {str(e)}, raw string: {suggestions_str}")
+            suggestions = []
+
+    return {
+        "content": result.split("{")[0].strip(),
+        "suggestions": suggestions,
+        "usage": response_body.get("usage", {}),
+    }
+
+@router.post("", response_model=Dict)
+async def copilot_chat(request: CopilotRequest):
+    try:
+        state = load_session_state(request)
+        # boto3 is blocking; keep the event loop free for other requests while Bedrock answers
+        reply = await run_in_threadpool(generate_reply, state)
+        content = reply["content"]
+        suggestions = reply["suggestions"]
+
+        # Persist the turn only after a successful reply so a failed request can be retried as-is
+        assistant_message = {"role": "assistant", "content": content}
+        state["messages"].append(assistant_message)
+        if request.sessionId:
+            session_id = request.sessionId
+            new_messages = [{"role": "user", "content": request.message}] if request.message is not None else []
+            save_session(session_id, state, new_messages + [assistant_message])
+        else:
+            session_id = create_session(state)
 
         # Return the response with generated timestamps
         current_time = datetime.utcnow().isoformat() + "Z"
         return {
+            "sessionId": session_id,
             "role": "assistant",
-            "content": result.split("{")[0].strip(),
+            "content": content,
             "timestamp": current_time,
             "createdAt": current_time,
             "suggestions": suggestions
@@ -163,4 +245,98 @@ async def copilot_chat(request: CopilotRequest):
         raise
     except Exception as e:
         logger.error(f"Unexpected error in copilot endpoint: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Failed to process copilot request: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to process copilot request: {str(e)}")
+
+def run_prefetch(prefetch_id: str, step: int, form_data: Dict[str, Any]) -> None:
+    """Background task: generate the opening advice for `step` and store it under `prefetch_id`."""
+    state = {
+        "step": step,
+        "messages": [{
+            "role": "user",
+            "content": f"I'm starting step {step}. Based on my form data so far, give me brief initial advice for this step."
+        }],
+        "context": [],
+        "formData": form_data,
+        "formDataText": render_form_data(form_data),
+    }
+    try:
+        reply = generate_reply(state)
+    except Exception as e:
+        logger.error(f"Prefetch {prefetch_id} for step {step} failed: {str(e)}", exc_info=True)
+        prefetch_service.record("failed")
+        prefetch_service.consume_entry(prefetch_id)
+        return
+
+    prefetch_service.record("completed")
+    prefetch_service.record("input_tokens", reply["usage"].get("input_tokens", 0))
+    prefetch_service.record("output_tokens", reply["usage"].get("output_tokens", 0))
+    if prefetch_service.get_entry(prefetch_id) is None:
+        logger.debug(f"Prefetch {prefetch_id} for step {step} was discarded before it finished")
+        return
+    state["messages"].append({"role": "assistant", "content": reply["content"]})
+    prefetch_service.complete_entry(prefetch_id, {
+        "status": "ready",
+        "step": step,
+        "state": state,
+        "suggestions": reply["suggestions"],
+    })
+    logger.debug(f"Prefetch {prefetch_id} for step {step} ready")
+
+@router.post("/prefetch", response_model=Dict)
+async def schedule_prefetch(request: CopilotPrefetchRequest, background_tasks: BackgroundTasks):
+    if not prefetch_service.PREFETCH_ENABLED:
+        return {"enabled": False, "prefetchId": None}
+    if request.step not in STEP_INSTRUCTIONS:
+        raise HTTPException(status_code=400, detail=f"Invalid step: {request.step}")
+    if not prefetch_service.try_acquire_budget():
+        logger.info(f"Prefetch budget exhausted, skipping step {request.step}")
+        return {"enabled": True, "prefetchId": None}
+
+    prefetch_id = prefetch_service.create_entry(request.step)
+    background_tasks.add_task(run_prefetch, prefetch_id, request.step, request.formData)
+    return {"enabled": True, "prefetchId": prefetch_id}
+
+@router.get("/prefetch/metrics", response_model=Dict)
+async def prefetch_metrics():
+    return prefetch_service.get_metrics()
+
+@router.get("/prefetch/{prefetch_id}", response_model=Dict)
+async def get_prefetched_guidance(prefetch_id: str):
+    """Return prefetched guidance as a copilot reply with a new session, or 204 if none is available."""
+    loop = asyncio.get_running_loop()
+    entry = prefetch_service.get_entry(prefetch_id)
+    deadline = loop.time() + prefetch_service.PREFETCH_WAIT_SECONDS
+    while entry is not None and entry["status"] == "pending" and loop.time() < deadline:
+        await asyncio.sleep(0.25)
+        entry = prefetch_service.get_entry(prefetch_id)
+
+    # Claim atomically: concurrent requests (possibly on other workers) must not both serve it
+    if entry is not None and entry["status"] == "ready":
+        entry = prefetch_service.claim_entry(prefetch_id)
+
+    if entry is None or entry["status"] != "ready":
+        prefetch_service.record("misses")
+        # Nobody will ask for it again; don't store the result if the generation is still running
+        prefetch_service.consume_entry(prefetch_id)
+        return Response(status_code=204)
+
+    prefetch_service.record("hits")
+    state = entry["state"]
+    session_id = create_session(state)
+
+    current_time = datetime.utcnow().isoformat() + "Z"
+    return {
+        "sessionId": session_id,
+        "role": "assistant",
+        "content": state["messages"][-1]["content"],
+        "timestamp": current_time,
+        "createdAt": current_time,
+        "suggestions": entry["suggestions"]
+    }
+
+@router.delete("/prefetch/{prefetch_id}", status_code=204)
+async def discard_prefetched_guidance(prefetch_id: str):
+    """Drop prefetched guidance the client won't show (e.g. the step already has a conversation)."""
+    if prefetch_service.claim_entry(prefetch_id) is not None:
+        prefetch_service.record("discarded")
+    return Response(status_code=204)
@@ -3,8 +3,9 @@ from fastapi.middleware.cors import CORSMiddleware
 from app.api.challenge import router as challenge_router
 from app.api.help_request import router as help_request_router
 from app.api.copilot import router as copilot_router
-from app.services.db_service import init_db
+from app.services.db_service import LEADER_TASKS_DONE_ENV, init_db
 import logging
+import os
 import time
 
 # Configure logging
@@ -64,6 +65,10 @@ app.include_router(copilot_router, prefix="/api")
 
 @app.on_event("startup")
 def startup_event():
+    # Under `python -m app.serve` the leader process has already initialized the database
+    if os.getenv(LEADER_TASKS_DONE_ENV) == "1":
+        logger.debug(f"Worker {os.getpid()} skipping database initialization")
+        return
     try:
         logger.debug("Initializing database")
         init_db()
@@ -72,6 +77,11 @@ def startup_event():
         logger.error(f"Failed to initialize database: {str(e)}", exc_info=True)
         raise
 
+@app.on_event("shutdown")
+def shutdown_event():
+    # Runs after uvicorn has stopped accepting connections and drained in-flight requests
+    logger.info(f"Worker {os.getpid()} shut down")
+
 @app.get("/api")
 async def root():
     return {"message": "CrowdLaunch API"}
\ No newline at end of file
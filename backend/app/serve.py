@@ -0,0 +1,132 @@
+# app/serve.py
+"""Production entrypoint: run one-time startup tasks, then start the API with several worker processes.
+
+Usage: python -m app.serve [--workers N] [--host HOST] [--port PORT]
+"""
+import argparse
+import logging
+import os
+import socket
+import time
+
+import uvicorn
+from dotenv import load_dotenv
+from uvicorn.supervisors import Multiprocess
+
+from app.services.db_service import LEADER_TASKS_DONE_ENV, init_db
+
+load_dotenv()
+
+# Configure logging
+logging.basicConfig(
+    filename="/app/debug.log",
+    level=logging.DEBUG,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+SHARED_STATE_PATH = os.getenv("CROWDLAUNCH_SHARED_STATE_PATH", "/tmp/crowdlaunch-shared-state.db")
+
+
+def run_leader_tasks() -> None:
+    """Tasks that must run exactly once per deployment, before any worker accepts requests."""
+    logger.debug("Initializing database (leader)")
+    init_db()
+    logger.info("Database initialized successfully")
+
+
+def configure_shared_state(workers: int) -> None:
+    """Point every worker at the same session/metrics store unless one is already configured."""
+    if workers <= 1 or os.getenv("COPILOT_SESSION_BACKEND_URL"):
+        return
+    # Local stand-in store: start each deployment with a clean file
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(SHARED_STATE_PATH + suffix):
+            os.remove(SHARED_STATE_PATH + suffix)
+    os.environ["COPILOT_SESSION_BACKEND_URL"] = f"sqlite:///{SHARED_STATE_PATH}"
+    logger.info(f"Using shared state store at {SHARED_STATE_PATH} for {workers} workers")
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    """Bind the shared listening socket for the workers.
+
+    uvicorn's own multi-worker socket is created with protocol 0, which makes asyncio skip
+    TCP_NODELAY on accepted connections and adds ~40ms to every keep-alive response.
+    """
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.set_inheritable(True)
+    return sock
+
+
+class DrainingMultiprocess(Multiprocess):
+    """Stop all workers in parallel.
+
+    uvicorn 0.23's supervisor terminates and joins workers one at a time, so the last worker only
+    starts draining after all others have finished and keeps accepting requests meanwhile.
+    """
+
+    def __init__(self, *args, drain_timeout: float, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.drain_timeout = drain_timeout
+
+    def shutdown(self) -> None:
+        for process in self.processes:
+            process.terminate()
+
+        # Every worker shares one deadline; a little slack lets uvicorn finish its own shutdown
+        deadline = time.monotonic() + self.drain_timeout + 5
+        for process in self.processes:
+            process.join(max(deadline - time.monotonic(), 0))
+        for process in self.processes:
+            if process.is_alive():
+                logger.warning(f"Worker {process.pid} did not drain in time, killing it")
+                process.kill()
+                process.join()
+
+        logger.info(f"Stopped {len(self.processes)} workers")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the CrowdLaunch API with multiple workers")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    # `or` so variables left empty in .env (e.g. `WEB_CONCURRENCY=`) fall back to the defaults
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT") or 8000))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY") or os.cpu_count() or 1))
+    parser.add_argument(
+        "--drain-timeout",
+        type=int,
+        default=int(os.getenv("COPILOT_DRAIN_TIMEOUT_SECONDS") or 30),
+        help="Seconds to let in-flight requests (e.g. copilot calls) finish on shutdown",
+    )
+    args = parser.parse_args()
+
+    configure_shared_state(args.workers)
+    if os.getenv(LEADER_TASKS_DONE_ENV) != "1":
+        run_leader_tasks()
+        os.environ[LEADER_TASKS_DONE_ENV] = "1"
+
+    logger.info(f"Starting API on {args.host}:{args.port} with {args.workers} worker(s)")
+    config = uvicorn.Config(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        timeout_graceful_shutdown=args.drain_timeout,
+    )
+    server = uvicorn.Server(config)
+    if config.workers > 1:
+        DrainingMultiprocess(
+            config,
+            target=server.run,
+            sockets=[bind_socket(args.host, args.port)],
+            drain_timeout=args.drain_timeout,
+        ).run()
+    else:
+        server.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -22,6 +22,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Set by `python -m app.serve` after the leader process has run init_db; workers inherit it and skip init
+LEADER_TASKS_DONE_ENV = "CROWDLAUNCH_LEADER_TASKS_DONE"
+
 def init_db():
     retries = 5
     while retries > 0:
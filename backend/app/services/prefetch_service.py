@@ -0,0 +1,104 @@
+# app/services/prefetch_service.py
+import logging
+import os
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+from app.services import session_service
+
+load_dotenv()
+
+# Configure logging
+logging.basicConfig(
+    filename="/app/debug.log",
+    level=logging.DEBUG,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+PREFETCH_ENABLED = os.getenv("COPILOT_PREFETCH_ENABLED", "false").lower() in ("1", "true", "yes")
+# Maximum number of speculative generations started per clock hour
+PREFETCH_HOURLY_BUDGET = int(os.getenv("COPILOT_PREFETCH_HOURLY_BUDGET", "100"))
+PREFETCH_TTL_SECONDS = int(os.getenv("COPILOT_PREFETCH_TTL_SECONDS", "900"))
+# How long a guidance request waits for a generation that is still running
+PREFETCH_WAIT_SECONDS = float(os.getenv("COPILOT_PREFETCH_WAIT_SECONDS", "10"))
+
+KEY_PREFIX = "prefetch:"
+METRIC_PREFIX = "prefetch-metric:"
+BUDGET_PREFIX = "prefetch-budget:"
+
+# Counters live in the session backend so they add up across worker processes
+METRICS = (
+    "scheduled",
+    "skipped_budget",
+    "completed",
+    "failed",
+    "hits",
+    "misses",
+    "discarded",
+    "input_tokens",
+    "output_tokens",
+)
+
+
+def record(event: str, amount: int = 1) -> None:
+    session_service.session_backend.incr(METRIC_PREFIX + event, amount)
+
+
+def get_metrics() -> Dict[str, Any]:
+    snapshot: Dict[str, Any] = {
+        name: session_service.session_backend.get_counter(METRIC_PREFIX + name) for name in METRICS
+    }
+    # Every prefetch the client resolved: shown, unavailable when asked for, or thrown away
+    resolved = snapshot["hits"] + snapshot["misses"] + snapshot["discarded"]
+    snapshot["hit_rate"] = round(snapshot["hits"] / resolved, 4) if resolved else None
+    # Share of finished speculative generations that were actually shown to a user
+    snapshot["utilization"] = round(snapshot["hits"] / snapshot["completed"], 4) if snapshot["completed"] else None
+    snapshot["enabled"] = PREFETCH_ENABLED
+    snapshot["hourly_budget"] = PREFETCH_HOURLY_BUDGET
+    used = session_service.session_backend.get_counter(_budget_key())
+    snapshot["budget_remaining"] = max(PREFETCH_HOURLY_BUDGET - used, 0)
+    return snapshot
+
+
+def _budget_key() -> str:
+    return BUDGET_PREFIX + str(int(time.time() // 3600))
+
+
+def try_acquire_budget() -> bool:
+    """Reserve one speculative generation from the current hour's budget."""
+    used = session_service.session_backend.incr(_budget_key(), 1, ttl=7200)
+    if used > PREFETCH_HOURLY_BUDGET:
+        record("skipped_budget")
+        return False
+    return True
+
+
+def create_entry(step: int) -> str:
+    prefetch_id = uuid.uuid4().hex
+    session_service.session_backend.set(
+        KEY_PREFIX + prefetch_id, {"status": "pending", "step": step}, PREFETCH_TTL_SECONDS
+    )
+    record("scheduled")
+    return prefetch_id
+
+
+def complete_entry(prefetch_id: str, entry: Dict[str, Any]) -> None:
+    session_service.session_backend.set(KEY_PREFIX + prefetch_id, entry, PREFETCH_TTL_SECONDS)
+
+
+def get_entry(prefetch_id: str) -> Optional[Dict[str, Any]]:
+    return session_service.session_backend.get(KEY_PREFIX + prefetch_id)
+
+
+def consume_entry(prefetch_id: str) -> None:
+    """Drop an entry without serving it (e.g. after a failed generation)."""
+    session_service.session_backend.delete(KEY_PREFIX + prefetch_id)
+
+
+def claim_entry(prefetch_id: str) -> Optional[Dict[str, Any]]:
+    """Prefetched guidance is served once; atomically take it out of the store."""
+    return session_service.session_backend.pop(KEY_PREFIX + prefetch_id)
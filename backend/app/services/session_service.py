@@ -0,0 +1,376 @@
+# app/services/session_service.py
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Configure logging
+logging.basicConfig(
+    filename="/app/debug.log",
+    level=logging.DEBUG,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+SESSION_TTL_SECONDS = int(os.getenv("COPILOT_SESSION_TTL_SECONDS", "1800"))
+SESSION_MAX_ENTRIES = int(os.getenv("COPILOT_SESSION_MAX_ENTRIES", "10000"))
+SESSION_BACKEND_URL = os.getenv("COPILOT_SESSION_BACKEND_URL", "")
+# Conversation history lives in its own append-only list next to the session header
+HISTORY_SUFFIX = ":messages"
+
+
+class SessionBackend(ABC):
+    """Storage interface for copilot sessions. Implementations must expire entries after `ttl` seconds."""
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def set(self, session_id: str, data: Dict[str, Any], ttl: int) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        ...
+
+    @abstractmethod
+    def pop(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Atomically remove and return an entry, so only one caller can claim it."""
+        ...
+
+    @abstractmethod
+    def append(self, key: str, items: List[Dict[str, Any]], ttl: int) -> None:
+        """Append items to a list, creating it if needed, and refresh its TTL."""
+        ...
+
+    @abstractmethod
+    def get_list(self, key: str) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def incr(self, key: str, amount: int = 1, ttl: Optional[int] = None) -> int:
+        """Atomically add `amount` to a counter and return the new value."""
+        ...
+
+    @abstractmethod
+    def get_counter(self, key: str) -> int:
+        ...
+
+
+class InMemorySessionBackend(SessionBackend):
+    """Process-local store with TTL eviction and a least-recently-used size cap."""
+
+    def __init__(self, max_entries: int = SESSION_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._counters: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def _evict_expired(self, now: float) -> None:
+        expired = [key for key, (expires_at, _) in self._entries.items() if expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            expires_at, data = entry
+            if expires_at <= time.monotonic():
+                del self._entries[session_id]
+                return None
+            self._entries.move_to_end(session_id)
+            return data
+
+    def set(self, session_id: str, data: Dict[str, Any], ttl: int) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._entries[session_id] = (now + ttl, data)
+            self._entries.move_to_end(session_id)
+            if len(self._entries) > self.max_entries:
+                self._evict_expired(now)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def pop(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.pop(session_id, None)
+            if entry is None or entry[0] <= time.monotonic():
+                return None
+            return entry[1]
+
+    def append(self, key: str, items: List[Dict[str, Any]], ttl: int) -> None:
+        with self._lock:
+            now = time.monotonic()
+            entry = self._entries.get(key)
+            values = entry[1] if entry is not None and entry[0] > now else []
+            values.extend(items)
+            self._entries[key] = (now + ttl, values)
+            self._entries.move_to_end(key)
+
+    def get_list(self, key: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                return []
+            self._entries.move_to_end(key)
+            return list(entry[1])
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[int] = None) -> int:
+        with self._lock:
+            now = time.monotonic()
+            expires_at, value = self._counters.get(key, (None, 0))
+            if expires_at is not None and expires_at <= now:
+                expires_at, value = None, 0
+            if expires_at is None and ttl is not None:
+                expires_at = now + ttl
+            self._counters[key] = (expires_at, value + amount)
+            return value + amount
+
+    def get_counter(self, key: str) -> int:
+        with self._lock:
+            expires_at, value = self._counters.get(key, (None, 0))
+            if expires_at is not None and expires_at <= time.monotonic():
+                return 0
+            return value
+
+
+class RedisSessionBackend(SessionBackend):
+    """Shared store for deployments running several API processes. Requires the `redis` package."""
+
+    def __init__(self, url: str, prefix: str = "crowdlaunch:copilot-session:"):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        raw = self.client.get(self.prefix + session_id)
+        return json.loads(raw) if raw else None
+
+    def set(self, session_id: str, data: Dict[str, Any], ttl: int) -> None:
+        self.client.setex(self.prefix + session_id, ttl, json.dumps(data))
+
+    def delete(self, session_id: str) -> None:
+        self.client.delete(self.prefix + session_id)
+
+    def pop(self, session_id: str) -> Optional[Dict[str, Any]]:
+        # GET + DEL in one MULTI/EXEC transaction (GETDEL needs Redis 6.2+)
+        pipe = self.client.pipeline(transaction=True)
+        pipe.get(self.prefix + session_id)
+        pipe.delete(self.prefix + session_id)
+        raw, _ = pipe.execute()
+        return json.loads(raw) if raw else None
+
+    def append(self, key: str, items: List[Dict[str, Any]], ttl: int) -> None:
+        pipe = self.client.pipeline(transaction=True)
+        if items:
+            pipe.rpush(self.prefix + key, *[json.dumps(item) for item in items])
+        pipe.expire(self.prefix + key, ttl)
+        pipe.execute()
+
+    def get_list(self, key: str) -> List[Dict[str, Any]]:
+        return [json.loads(raw) for raw in self.client.lrange(self.prefix + key, 0, -1)]
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[int] = None) -> int:
+        value = self.client.incrby(self.prefix + key, amount)
+        if ttl is not None and value == amount:
+            self.client.expire(self.prefix + key, ttl)
+        return value
+
+    def get_counter(self, key: str) -> int:
+        raw = self.client.get(self.prefix + key)
+        return int(raw) if raw else 0
+
+
+class SqliteSessionBackend(SessionBackend):
+    """Single-host stand-in for a shared store, used when several worker processes run on one machine."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT, expires_at REAL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS counters (key TEXT PRIMARY KEY, value INTEGER, expires_at REAL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS lists (key TEXT PRIMARY KEY, expires_at REAL)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS list_items (id INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT, value TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS list_items_key ON list_items (key, id)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            "SELECT value FROM entries WHERE key = ? AND expires_at > ?", (session_id, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, session_id: str, data: Dict[str, Any], ttl: int) -> None:
+        conn = self._connect()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO entries (key, value, expires_at) VALUES (?, ?, ?)",
+            (session_id, json.dumps(data), now + ttl),
+        )
+        # Sweep expired rows now and then instead of on every write
+        self._writes += 1
+        if self._writes % 200 == 0:
+            self._sweep(conn, now)
+
+    def _sweep(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+        conn.execute("DELETE FROM list_items WHERE key IN (SELECT key FROM lists WHERE expires_at <= ?)", (now,))
+        conn.execute("DELETE FROM lists WHERE expires_at <= ?", (now,))
+
+    def delete(self, session_id: str) -> None:
+        self._connect().execute("DELETE FROM entries WHERE key = ?", (session_id,))
+
+    def pop(self, session_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            "DELETE FROM entries WHERE key = ? RETURNING value, expires_at", (session_id,)
+        ).fetchone()
+        if row is None or row[1] <= time.time():
+            return None
+        return json.loads(row[0])
+
+    def append(self, key: str, items: List[Dict[str, Any]], ttl: int) -> None:
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            expired = conn.execute(
+                "SELECT 1 FROM lists WHERE key = ? AND expires_at <= ?", (key, now)
+            ).fetchone()
+            if expired:
+                conn.execute("DELETE FROM list_items WHERE key = ?", (key,))
+            conn.execute(
+                "INSERT OR REPLACE INTO lists (key, expires_at) VALUES (?, ?)", (key, now + ttl)
+            )
+            conn.executemany(
+                "INSERT INTO list_items (key, value) VALUES (?, ?)",
+                [(key, json.dumps(item)) for item in items],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get_list(self, key: str) -> List[Dict[str, Any]]:
+        rows = self._connect().execute(
+            """
+            SELECT list_items.value FROM list_items JOIN lists ON lists.key = list_items.key
+            WHERE list_items.key = ? AND lists.expires_at > ?
+            ORDER BY list_items.id
+            """,
+            (key, time.time()),
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def incr(self, key: str, amount: int = 1, ttl: Optional[int] = None) -> int:
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        row = self._connect().execute(
+            """
+            INSERT INTO counters (key, value, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET
+                value = CASE WHEN counters.expires_at IS NOT NULL AND counters.expires_at <= ?
+                             THEN excluded.value ELSE counters.value + excluded.value END,
+                expires_at = CASE WHEN counters.expires_at IS NOT NULL AND counters.expires_at <= ?
+                                  THEN excluded.expires_at ELSE counters.expires_at END
+            RETURNING value
+            """,
+            (key, amount, expires_at, now, now),
+        ).fetchone()
+        return row[0]
+
+    def get_counter(self, key: str) -> int:
+        row = self._connect().execute(
+            "SELECT value FROM counters WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time()),
+        ).fetchone()
+        return row[0] if row else 0
+
+
+def _create_backend() -> SessionBackend:
+    if SESSION_BACKEND_URL.startswith(("redis://", "rediss://")):
+        try:
+            backend = RedisSessionBackend(SESSION_BACKEND_URL)
+            logger.info("Using Redis copilot session backend")
+            return backend
+        except ImportError:
+            logger.warning("COPILOT_SESSION_BACKEND_URL is set but redis is not installed; using in-memory sessions")
+    elif SESSION_BACKEND_URL.startswith("sqlite:///"):
+        logger.info(f"Using SQLite copilot session backend at {SESSION_BACKEND_URL}")
+        return SqliteSessionBackend(SESSION_BACKEND_URL[len("sqlite:///"):])
+    elif SESSION_BACKEND_URL:
+        logger.warning(f"Unsupported COPILOT_SESSION_BACKEND_URL scheme: {SESSION_BACKEND_URL}; using in-memory sessions")
+    return InMemorySessionBackend()
+
+
+session_backend: SessionBackend = _create_backend()
+
+
+def _header(state: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in state.items() if key != "messages"}
+
+
+def create_session(state: Dict[str, Any]) -> str:
+    session_id = uuid.uuid4().hex
+    session_backend.set(session_id, _header(state), SESSION_TTL_SECONDS)
+    session_backend.append(session_id + HISTORY_SUFFIX, state["messages"], SESSION_TTL_SECONDS)
+    logger.debug(f"Created copilot session {session_id}")
+    return session_id
+
+
+def get_session(session_id: str) -> Optional[Dict[str, Any]]:
+    state = session_backend.get(session_id)
+    if state is None:
+        return None
+    state = dict(state)
+    state["messages"] = session_backend.get_list(session_id + HISTORY_SUFFIX)
+    return state
+
+
+def save_session(session_id: str, state: Dict[str, Any], new_messages: List[Dict[str, Any]]) -> None:
+    """Store the session header, append this turn's messages and refresh both TTLs.
+
+    Only the new messages are serialized, so the write cost doesn't grow with the conversation.
+    """
+    session_backend.set(session_id, _header(state), SESSION_TTL_SECONDS)
+    session_backend.append(session_id + HISTORY_SUFFIX, new_messages, SESSION_TTL_SECONDS)
+
+
+def apply_form_data_diff(form_data: Dict[str, Any], diff: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge changed fields into the stored form data; a null value removes the field."""
+    merged = dict(form_data)
+    for key, value in diff.items():
+        if value is None:
+            merged.pop(key, None)
+        else:
+            merged[key] = value
+    return merged
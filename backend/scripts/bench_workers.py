@@ -0,0 +1,134 @@
+"""Measure API throughput as the number of worker processes grows.
+
+Starts `python -m app.serve` with 1, 2, 4, ... workers (database initialization skipped),
+drives it with keep-alive HTTP clients in separate processes and prints requests/second and
+scaling efficiency relative to one worker. Run from the backend directory:
+
+    python scripts/bench_workers.py --max-workers 4 --duration 10
+
+Load generator processes compete with the server for CPU, so run it on a machine with spare
+cores (or lower --clients-per-worker) to see the server's own scaling.
+"""
+import argparse
+import http.client
+import multiprocessing
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def wait_until_ready(port: int, timeout: float = 30.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+        try:
+            conn.request("GET", "/api")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        finally:
+            conn.close()
+        time.sleep(0.2)
+    raise RuntimeError(f"Server on port {port} did not become ready")
+
+
+def client(port: int, path: str, duration: float, results) -> None:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    done = errors = 0
+    deadline = time.time() + duration
+    while time.time() < deadline:
+        try:
+            conn.request("GET", path)
+            response = conn.getresponse()
+            response.read()
+            if response.status == 200:
+                done += 1
+            else:
+                errors += 1
+        except OSError:
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    results.put((done, errors))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def run(workers: int, clients: int, path: str, duration: float, warmup: float) -> float:
+    port = free_port()
+    state_dir = tempfile.mkdtemp(prefix="bench-workers-")
+    env = dict(
+        os.environ,
+        CROWDLAUNCH_LEADER_TASKS_DONE="1",
+        WEB_CONCURRENCY=str(workers),
+        # app.serve recreates the shared state file on start; never point it at a real deployment's
+        CROWDLAUNCH_SHARED_STATE_PATH=os.path.join(state_dir, "shared-state.db"),
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.serve", "--host", "127.0.0.1", "--port", str(port)],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_ready(port)
+        # The first worker can answer before the others finish importing; give them time to come up
+        time.sleep(warmup)
+        results = multiprocessing.Queue()
+        procs = [multiprocessing.Process(target=client, args=(port, path, duration, results)) for _ in range(clients)]
+        for proc in procs:
+            proc.start()
+        totals = [results.get() for _ in procs]
+        for proc in procs:
+            proc.join()
+        done = sum(t[0] for t in totals)
+        errors = sum(t[1] for t in totals)
+        if errors:
+            print(f"  {errors} failed requests with {workers} worker(s)")
+        return done / duration
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+        shutil.rmtree(state_dir, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--clients-per-worker", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=5.0, help="Seconds to wait after the server answers")
+    parser.add_argument("--path", default="/api", help="GET endpoint to load, e.g. /api/copilot/prefetch/metrics")
+    args = parser.parse_args()
+
+    counts = []
+    workers = 1
+    while workers <= args.max_workers:
+        counts.append(workers)
+        workers *= 2
+    if counts[-1] != args.max_workers:
+        counts.append(args.max_workers)
+
+    print(f"{os.cpu_count()} CPU(s), path {args.path}, {args.duration:.0f}s per run")
+    if (os.cpu_count() or 1) < args.max_workers:
+        print("warning: fewer CPUs than workers; workers will share cores and the results won't show scaling")
+    print(f"{'workers':>8} {'req/s':>10} {'speedup':>8} {'efficiency':>10}")
+    baseline = None
+    for workers in counts:
+        rps = run(workers, workers * args.clients_per_worker, args.path, args.duration, args.warmup)
+        baseline = baseline or rps
+        speedup = rps / baseline
+        print(f"{workers:>8} {rps:>10.0f} {speedup:>8.2f} {speedup / workers:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -61,6 +61,8 @@ export default function OnboardingPage() {
   const [stepValidation, setStepValidation] = useState({});
   const [challengeId, setChallengeId] = useState<number | null>(null);
   const [currentFormValues, setCurrentFormValues] = useState<any>({});
+  // Set each time a step is submitted (a new object, so re-submitting the same step counts again)
+  const [completedStep, setCompletedStep] = useState<{ step: number } | null>(null);
   const totalSteps = 7;
 
   const formRef = useRef<{ submit: (callback?: (data?: any) => void) => void; getValues: () => any }>(null);
@@ -156,6 +158,7 @@ export default function OnboardingPage() {
         };
 
         updateFormData(updatedFormData);
+        setCompletedStep({ step: currentStep });
 
         if (currentStep < totalSteps) {
           setCurrentStep(currentStep + 1);
@@ -380,6 +383,7 @@ export default function OnboardingPage() {
                 success_metrics: formData.step7?.success_metrics || "",
               }}
               currentFormValues={currentFormValues}
+              completedStep={completedStep}
               onRequestSupport={() => setShowSupportModal(true)}
             />
           </div>
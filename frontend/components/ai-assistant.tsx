@@ -6,8 +6,14 @@ import { motion, AnimatePresence } from "framer-motion";
 import { Button } from "@/components/ui/button";
 import { Card, CardHeader, CardContent, CardFooter } from "@/components/ui/card";
 import { Send, Loader2, User, Trash2, Bot, RefreshCw, Clock, ChevronDown, ChevronUp } from "lucide-react";
-import { fetchCopilot, type CopilotRequest } from "@/lib/api";
-import { useLocalStorage } from "@/lib/local-storage";
+import {
+  discardPrefetchedGuidance,
+  fetchCopilot,
+  fetchPrefetchedGuidance,
+  prefetchCopilot,
+  type CopilotRequest,
+} from "@/lib/api";
+import { loadFromLocalStorage, useLocalStorage } from "@/lib/local-storage";
 import { toast } from "@/hooks/use-toast";
 import { formatDistanceToNow } from "date-fns";
 import { Avatar, AvatarFallback } from "@/components/ui/avatar";
@@ -83,6 +89,7 @@ interface AIAssistantProps {
     notification_methods?: string[];
     access_level?: string[];
   };
+  completedStep?: { step: number } | null;
   onRequestSupport: () => void;
 }
 
@@ -102,7 +109,7 @@ const suggestionsByStep: { [key: number]: string[] } = {
   7: ["Key metrics", "Measure success", "Notifications", "Handle disputes", "Send updates"],
 };
 
-export function AIAssistant({ currentStep, formData, currentFormValues, onRequestSupport }: AIAssistantProps) {
+export function AIAssistant({ currentStep, formData, currentFormValues, completedStep, onRequestSupport }: AIAssistantProps) {
   const [messages, setMessages] = useLocalStorage<Message[]>(`crowdlaunch:chat-step${currentStep}`, [
     {
       role: "assistant",
@@ -122,6 +129,11 @@ export function AIAssistant({ currentStep, formData, currentFormValues, onReques
   const messagesEndRef = useRef<HTMLDivElement>(null);
   const textareaRef = useRef<HTMLTextAreaElement>(null);
   const suggestionsScrollRef = useRef<HTMLDivElement>(null);
+  // Server-side copilot session per step, with the form data the server last saw
+  const copilotSessions = useRef<{ [step: number]: { id: string; formData: { [key: string]: any } } }>({});
+  // Speculatively prepared guidance per upcoming step, with the form data it was generated from.
+  // The id resolves once the server has accepted the prefetch (null if it was skipped).
+  const prefetches = useRef<{ [step: number]: { id: Promise<string | null>; formData: { [key: string]: any } } }>({});
   const isSuggestionDragging = useRef(false);
   const startX = useRef(0);
   const scrollLeft = useRef(0);
@@ -147,75 +159,105 @@ export function AIAssistant({ currentStep, formData, currentFormValues, onReques
     setFormattedTimestamps(newTimestamps);
   }, [messages]);
 
+  const buildRelevantFormData = useCallback(
+    (uptoStep: number) => {
+      const stepFormData: { [key: number]: { [key: string]: any } } = {
+        1: {
+          challenge_type: currentFormValues.challenge_type || formData.challenge_type,
+          title: currentFormValues.title || formData.title,
+          problem_statement: currentFormValues.problem_statement || formData.problem_statement,
+          goals: currentFormValues.goals || formData.goals,
+        },
+        2: {
+          participant_type: currentFormValues.participant_type || formData.target_audience,
+          enable_forums: formData.enable_forums,
+          geographic_filter: currentFormValues.geographic_filter || formData.geographic_filters,
+          language: currentFormValues.language || formData.participant_skills,
+          team_participation: formData.team_participation || false,
+        },
+        3: {
+          submission_formats: currentFormValues.submission_formats || formData.submission_formats,
+          submission_documentation: currentFormValues.submission_documentation || formData.required_docs,
+          submission_instructions: currentFormValues.submission_instructions || formData.instructions,
+        },
+        4: {
+          prize_model: currentFormValues.prize_model || formData.prize_structure,
+          non_monetary_rewards: formData.non_monetary_rewards,
+          budget: currentFormValues.budget || formData.budget,
+          first_prize: currentFormValues.first_prize || formData.first_prize,
+          second_prize: currentFormValues.second_prize || formData.second_prize,
+          third_prize: currentFormValues.third_prize || formData.third_prize,
+          honorable_mentions: currentFormValues.honorable_mentions || formData.honorable_mentions,
+        },
+        5: {
+          start_date: currentFormValues.start_date || formData.start_date,
+          end_date: currentFormValues.end_date || formData.submission_deadline,
+          milestones: formData.milestones,
+          timeline_notes: formData.timeline,
+        },
+        6: {
+          evaluation_model: currentFormValues.evaluation_model || formData.evaluation_model || "post",
+          reviewers: currentFormValues.reviewers || formData.reviewers || [],
+          evaluation_criteria: currentFormValues.evaluation_criteria || formData.evaluation_criteria,
+          anonymized_review: formData.anonymous_judging,
+        },
+        7: {
+          notification_preferences: currentFormValues.notification_preferences || formData.notification_settings,
+          notification_methods: currentFormValues.notification_methods || formData.notification_methods || [],
+          announcement_template: currentFormValues.announcement_template || formData.announcement_template || "",
+          access_level: currentFormValues.access_level || formData.access_level || [],
+          success_metrics: formData.success_measures,
+        },
+      };
+
+      const relevantFormData: { [key: string]: any } = {};
+      for (let step = 1; step <= uptoStep; step++) {
+        if (stepFormData[step]) {
+          Object.assign(relevantFormData, stepFormData[step]);
+        }
+      }
+      return relevantFormData;
+    },
+    [formData, currentFormValues],
+  );
+
   const fetchResponse = useCallback(
     async (userInput: string) => {
       setIsLoading(true);
       try {
-        const stepFormData: { [key: number]: { [key: string]: any } } = {
-          1: {
-            challenge_type: currentFormValues.challenge_type || formData.challenge_type,
-            title: currentFormValues.title || formData.title,
-            problem_statement: currentFormValues.problem_statement || formData.problem_statement,
-            goals: currentFormValues.goals || formData.goals,
-          },
-          2: {
-            participant_type: currentFormValues.participant_type || formData.target_audience,
-            enable_forums: formData.enable_forums,
-            geographic_filter: currentFormValues.geographic_filter || formData.geographic_filters,
-            language: currentFormValues.language || formData.participant_skills,
-            team_participation: formData.team_participation || false,
-          },
-          3: {
-            submission_formats: currentFormValues.submission_formats || formData.submission_formats,
-            submission_documentation: currentFormValues.submission_documentation || formData.required_docs,
-            submission_instructions: currentFormValues.submission_instructions || formData.instructions,
-          },
-          4: {
-            prize_model: currentFormValues.prize_model || formData.prize_structure,
-            non_monetary_rewards: formData.non_monetary_rewards,
-            budget: currentFormValues.budget || formData.budget,
-            first_prize: currentFormValues.first_prize || formData.first_prize,
-            second_prize: currentFormValues.second_prize || formData.second_prize,
-            third_prize: currentFormValues.third_prize || formData.third_prize,
-            honorable_mentions: currentFormValues.honorable_mentions || formData.honorable_mentions,
-          },
-          5: {
-            start_date: currentFormValues.start_date || formData.start_date,
-            end_date: currentFormValues.end_date || formData.submission_deadline,
-            milestones: formData.milestones,
-            timeline_notes: formData.timeline,
-          },
-          6: {
-            evaluation_model: currentFormValues.evaluation_model || formData.evaluation_model || "post",
-            reviewers: currentFormValues.reviewers || formData.reviewers || [],
-            evaluation_criteria: currentFormValues.evaluation_criteria || formData.evaluation_criteria,
-            anonymized_review: formData.anonymous_judging,
-          },
-          7: {
-            notification_preferences: currentFormValues.notification_preferences || formData.notification_settings,
-            notification_methods: currentFormValues.notification_methods || formData.notification_methods || [],
-            announcement_template: currentFormValues.announcement_template || formData.announcement_template || "",
-            access_level: currentFormValues.access_level || formData.access_level || [],
-            success_metrics: formData.success_measures,
-          },
-        };
-
-        const relevantFormData: { [key: string]: any } = {};
-        for (let step = 1; step <= currentStep; step++) {
-          if (stepFormData[step]) {
-            Object.assign(relevantFormData, stepFormData[step]);
-          }
-        }
+        const relevantFormData = buildRelevantFormData(currentStep);
 
-        const payload: CopilotRequest = {
+        const fullPayload: CopilotRequest = {
           messages: [...messages.filter((msg) => msg.role !== "error"), { role: "user", content: userInput }],
           context: messages.filter((msg) => msg.role === "assistant" || msg.role === "user").map((msg) => msg.content),
           formData: relevantFormData,
           step: currentStep,
         };
-        console.log("Sending payload to fetchCopilot:", payload);
 
-        const response = await fetchCopilot(payload);
+        let response;
+        const session = copilotSessions.current[currentStep];
+        if (session) {
+          const formDataDiff: { [key: string]: any } = {};
+          for (const key of new Set([...Object.keys(session.formData), ...Object.keys(relevantFormData)])) {
+            if (JSON.stringify(session.formData[key]) !== JSON.stringify(relevantFormData[key])) {
+              formDataDiff[key] = relevantFormData[key] ?? null;
+            }
+          }
+          const payload: CopilotRequest = { sessionId: session.id, message: userInput, formDataDiff, step: currentStep };
+          console.log("Sending payload to fetchCopilot:", payload);
+          try {
+            response = await fetchCopilot(payload);
+          } catch (error: any) {
+            if (error.status !== 404) throw error;
+            delete copilotSessions.current[currentStep];
+          }
+        }
+        if (!response) {
+          console.log("Sending payload to fetchCopilot:", fullPayload);
+          response = await fetchCopilot(fullPayload);
+        }
+        copilotSessions.current[currentStep] = { id: response.sessionId, formData: relevantFormData };
+
         const assistantMessage: Message = {
           role: "assistant",
           content: response.content,
@@ -246,9 +288,77 @@ export function AIAssistant({ currentStep, formData, currentFormValues, onReques
         setIsLoading(false);
       }
     },
-    [currentStep, messages, setMessages, formData, currentFormValues],
+    [currentStep, messages, setMessages, buildRelevantFormData],
   );
 
+  // When a step is submitted, ask the backend to prepare the next step's opening advice
+  useEffect(() => {
+    if (!completedStep) return;
+    const nextStep = completedStep.step + 1;
+    if (nextStep > 7) return;
+    const stale = prefetches.current[nextStep];
+    if (stale) {
+      // Generated from an earlier submission of this step
+      stale.id
+        .then((id) => id && discardPrefetchedGuidance(id))
+        .catch((error) => console.warn("Failed to discard prefetched guidance:", error.message));
+    }
+    const prefetchFormData = buildRelevantFormData(completedStep.step);
+    prefetches.current[nextStep] = {
+      id: prefetchCopilot(nextStep, prefetchFormData)
+        .then((result) => result.prefetchId)
+        .catch((error) => {
+          console.warn("Copilot prefetch failed:", error.message);
+          return null;
+        }),
+      formData: prefetchFormData,
+    };
+    // Only react to new submissions, not to later form data changes
+  }, [completedStep]);
+
+  // On entering a step with a fresh chat, show the prefetched advice if it is available
+  useEffect(() => {
+    const prefetch = prefetches.current[currentStep];
+    if (!prefetch) return;
+    delete prefetches.current[currentStep];
+    let active = true;
+    prefetch.id
+      .then(async (prefetchId) => {
+        if (!prefetchId) return;
+        const storedChat = loadFromLocalStorage(`crowdlaunch:chat-step${currentStep}`);
+        if (!active || (storedChat && storedChat.length > 1)) {
+          // The user already has a conversation here or moved on; tell the server the guidance won't be used
+          await discardPrefetchedGuidance(prefetchId);
+          return;
+        }
+        const response = await fetchPrefetchedGuidance(prefetchId);
+        if (!response || !active) return;
+        copilotSessions.current[currentStep] = { id: response.sessionId, formData: prefetch.formData };
+        setMessages([
+          {
+            role: "assistant",
+            content: "Hi, I'm your AI Copilot! How can I assist you in defining your challenge?",
+            timestamp: new Date().toISOString(),
+            createdAt: new Date(),
+          },
+          {
+            role: "assistant",
+            content: response.content,
+            timestamp: new Date().toISOString(),
+            createdAt: new Date(),
+            suggestions: response.suggestions || [],
+          },
+        ]);
+        if (response.suggestions && response.suggestions.length > 0) {
+          setSuggestions(response.suggestions.slice(0, 5));
+        }
+      })
+      .catch((error) => console.warn("Failed to load prefetched guidance:", error.message));
+    return () => {
+      active = false;
+    };
+  }, [currentStep]);
+
   const handleSend = async () => {
     if (!input.trim()) return;
     await fetchResponse(input);
@@ -269,6 +379,7 @@ export function AIAssistant({ currentStep, formData, currentFormValues, onReques
   };
 
   const handleClearChat = () => {
+    delete copilotSessions.current[currentStep];
     setMessages([
       {
         role: "assistant",
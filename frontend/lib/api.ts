@@ -17,7 +17,9 @@ api.interceptors.response.use(
         ? error.response.data.detail.map((d: any) => d.msg || d).join("; ")
         : error.response.data.detail
       : error.message || "An unexpected error occurred";
-    return Promise.reject(new Error(errorMessage));
+    const wrapped: any = new Error(errorMessage);
+    wrapped.status = error.response?.status;
+    return Promise.reject(wrapped);
   },
 );
 
@@ -67,19 +69,25 @@ export async function createHelpRequest(data: any) {
 
 // Custom function with retry logic for copilot
 export interface CopilotRequest {
-  messages: {
+  // Full payload, sent when no server session exists yet
+  messages?: {
     role: string;
     content: string;
     timestamp?: string;
     createdAt?: string;
     isRetryable?: boolean;
   }[];
-  context: string[];
-  formData: { [key: string]: any };
+  context?: string[];
+  formData?: { [key: string]: any };
   step: number;
+  // Session payload: only the new message and the form fields that changed (null removes a field)
+  sessionId?: string;
+  message?: string;
+  formDataDiff?: { [key: string]: any };
 }
 
 export interface CopilotResponse {
+  sessionId: string;
   role: string;
   content: string;
   timestamp: string;
@@ -106,6 +114,10 @@ export async function fetchCopilot(data: CopilotRequest, maxRetries = 2): Promis
       console.log("Copilot response received:", response.data);
       return response.data;
     } catch (error: any) {
+      if (error.status === 404 && data.sessionId) {
+        // Session expired on the server; let the caller resend the full payload
+        throw error;
+      }
       if (attempt === maxRetries || !error.code || error.code !== "ECONNABORTED") {
         console.error(`Copilot request failed after ${attempt} attempts:`, error.message);
         throw error;
@@ -117,4 +129,25 @@ export async function fetchCopilot(data: CopilotRequest, maxRetries = 2): Promis
 
   // This should never be reached due to the throw in the loop, but TypeScript requires a return
   throw new Error("Failed to fetch copilot response after retries");
-}
\ No newline at end of file
+}
+
+export interface CopilotPrefetchResponse {
+  enabled: boolean;
+  prefetchId: string | null;
+}
+
+// Ask the backend to speculatively prepare guidance for an upcoming step (no-op unless enabled server-side)
+export async function prefetchCopilot(step: number, formData: { [key: string]: any }): Promise<CopilotPrefetchResponse> {
+  const response = await api.post("/copilot/prefetch", { step, formData });
+  return response.data;
+}
+
+// Returns the prefetched guidance, or null if it was not ready (204)
+export async function fetchPrefetchedGuidance(prefetchId: string): Promise<CopilotResponse | null> {
+  const response = await api.get(`/copilot/prefetch/${prefetchId}`);
+  return response.status === 204 ? null : response.data;
+}
+
+export async function discardPrefetchedGuidance(prefetchId: string): Promise<void> {
+  await api.delete(`/copilot/prefetch/${prefetchId}`);
+}